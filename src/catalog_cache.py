@@ -0,0 +1,128 @@
+"""
+Client-side catalog cache. Caches metadata query results (show tables, information_schema, table_info)
+with LRU eviction bounded by the total number of cached rows. Invalidated by DDL issued through the
+cache, or by polling a schema version signal of the system.
+"""
+
+import datetime
+from collections import OrderedDict
+from enum import Enum
+
+from experiment_logger.data_recorder import DatabaseSystem
+
+# Cheap queries whose result changes when the catalog changes
+SCHEMA_VERSION_QUERIES = {
+    DatabaseSystem.SQLITE: "PRAGMA schema_version;",
+    # xmin of the pg_class rows changes on create/alter/drop. COMMENT only touches pg_description
+    DatabaseSystem.POSTGRES: "SELECT max(xmin::text::bigint), count(*) FROM pg_catalog.pg_class;",
+    # duckdb has no catalog version in SQL. New tables get new oids, ADD COLUMN changes column_count
+    DatabaseSystem.DUCKDB: "SELECT count(*), max(table_oid), sum(column_count) FROM duckdb_tables();",
+}
+
+
+class CacheInvalidation(Enum):
+    """Enum for predefined catalog cache invalidation strategies"""
+
+    DDL_EVENT = "ddl_event"  # Clear on DDL executed through the cache
+    POLL = "poll"  # Clear when the schema version query returns a new value
+
+
+def fetch_rows(conn, database_system: DatabaseSystem, query: str) -> list[tuple]:
+    """Execute query and fetch the whole result"""
+    if database_system in (DatabaseSystem.SQLITE, DatabaseSystem.DUCKDB):
+        cursor = conn.execute(query)
+        return cursor.fetchall() if cursor.description else []
+    with conn.cursor() as curs:
+        curs.execute(query)
+        return curs.fetchall() if curs.description else []
+
+
+class CatalogCache:
+    """LRU cache of metadata query results for one connection.
+
+    Args:
+        conn: Connection of database_system.
+        database_system (DatabaseSystem): System of the connection.
+        invalidation (CacheInvalidation): How cached results are invalidated.
+        max_rows (int): Bound on the total number of cached rows. Larger results are not cached.
+        poll_interval (float): Minimum seconds between schema version polls. 0 polls on every lookup.
+    """
+
+    def __init__(
+        self,
+        conn,
+        database_system: DatabaseSystem,
+        *,
+        invalidation: CacheInvalidation = CacheInvalidation.DDL_EVENT,
+        max_rows: int = 100_000,
+        poll_interval: float = 0.0,
+    ):
+        if invalidation == CacheInvalidation.POLL and database_system not in SCHEMA_VERSION_QUERIES:
+            raise ValueError(f"No schema version signal for {database_system.value}")
+        self.conn = conn
+        self.database_system = database_system
+        self.invalidation = invalidation
+        self.max_rows = max_rows
+        self.poll_interval = datetime.timedelta(seconds=poll_interval)
+
+        self._entries: OrderedDict[str, list[tuple]] = OrderedDict()
+        self._num_rows = 0
+        self._version = None
+        self._last_poll = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.last_hit = False
+
+    def invalidate(self):
+        self._entries.clear()
+        self._num_rows = 0
+        self.invalidations += 1
+
+    def poll(self) -> bool:
+        """Run the schema version query unless the last poll is within poll_interval, and invalidate
+        if the version changed. Returns whether the query ran"""
+        now = datetime.datetime.now()
+        if self._last_poll is not None and now - self._last_poll < self.poll_interval:
+            return False
+        version = fetch_rows(
+            self.conn, self.database_system, SCHEMA_VERSION_QUERIES[self.database_system]
+        )
+        self._last_poll = datetime.datetime.now()
+        if version != self._version:
+            if self._version is not None:
+                self.invalidate()
+            self._version = version
+        return True
+
+    def query(self, query: str, poll: bool = True) -> list[tuple]:
+        """Cached result of a metadata query. Polls first for POLL invalidation, unless poll is False
+        because the caller already called poll()"""
+        if poll and self.invalidation == CacheInvalidation.POLL:
+            self.poll()
+
+        rows = self._entries.get(query)
+        self.last_hit = rows is not None
+        if rows is not None:
+            self.hits += 1
+            self._entries.move_to_end(query)
+            return rows
+
+        self.misses += 1
+        rows = fetch_rows(self.conn, self.database_system, query)
+        if len(rows) <= self.max_rows:
+            self._entries[query] = rows
+            self._num_rows += len(rows)
+            while self._num_rows > self.max_rows:
+                _, evicted = self._entries.popitem(last=False)
+                self._num_rows -= len(evicted)
+                self.evictions += 1
+        return rows
+
+    def execute_ddl(self, query: str):
+        """Execute a DDL statement. Invalidates the cache for DDL_EVENT"""
+        fetch_rows(self.conn, self.database_system, query)
+        if self.invalidation == CacheInvalidation.DDL_EVENT:
+            self.invalidate()
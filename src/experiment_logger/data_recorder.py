@@ -48,6 +48,19 @@ class DDLCommand(Enum):
     COMMENT = "COMMENT"
     SHOW = "SHOW"
     INFORMATION_SCHEMA = "INFORMATION_SCHEMA"
+    CONNECT = "CONNECT"
+    PRAGMA = "PRAGMA"
+    BEGIN = "BEGIN"
+    COMMIT = "COMMIT"
+    SCHEMA_VERSION = "SCHEMA_VERSION"
+
+
+class CommitPolicy(Enum):
+    """Enum for predefined transaction modes of the timed statements"""
+
+    AUTOCOMMIT = "autocommit"  # Driver autocommit. Commit is part of the statement
+    PER_STATEMENT = "per_statement"  # BEGIN; statement; COMMIT
+    BATCHED = "batched"  # BEGIN; N statements; COMMIT
 
 
 class DataRecorder:
@@ -62,12 +75,16 @@ class DataRecorder:
         # Create a table for each system if it doesn't exist - no need to check if it exists when we record
         for system in DatabaseSystem:
             table_name = f"{system.value}db_logs"  # So we get sqlite_experiment_logs, postgres_sqlite_experiment_logs_logs, etc.
-            create_table_query = f"""CREATE TABLE IF NOT EXISTS {table_name}(id INTEGER PRIMARY KEY AUTOINCREMENT,system_name TEXT,ddl_command TEXT,query_text TEXT,target_object TEXT,granularity INTEGER,repetition_nr INTEGER,query_runtime REAL,start_time DATETIME,end_time DATETIME);"""
+            create_table_query = f"""CREATE TABLE IF NOT EXISTS {table_name}(id INTEGER PRIMARY KEY AUTOINCREMENT,system_name TEXT,ddl_command TEXT,query_text TEXT,target_object TEXT,granularity INTEGER,repetition_nr INTEGER,query_runtime REAL,start_time DATETIME,end_time DATETIME,variant TEXT);"""
             # Seems like the cursor approach is just for batch operations?
             # And the "with" approach is for transactional operations where you want to commit after each operation, otherwise rolled back.
             # it also properly closes the connection after the block.
             with self.conn:
                 self.conn.execute(create_table_query)
+                # Log databases created before the variant column was added
+                columns = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table_name});")]
+                if "variant" not in columns:
+                    self.conn.execute(f"ALTER TABLE {table_name} ADD COLUMN variant TEXT;")
 
     def record(
         self,
@@ -80,11 +97,14 @@ class DataRecorder:
         query_runtime: float,
         start_time: datetime,
         end_time: datetime,
+        variant: str | None = None,
     ):
+        """variant labels the experiment parameters that are not part of the other columns,
+        e.g. the name distribution or connection settings"""
         table_name = f"{system.value}db_logs"  # Dyn table name based on system enum
         insert_query = f"""
-            INSERT INTO {table_name}(system_name,ddl_command,query_text,target_object,granularity,repetition_nr,query_runtime,start_time,end_time)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+            INSERT INTO {table_name}(system_name,ddl_command,query_text,target_object,granularity,repetition_nr,query_runtime,start_time,end_time,variant)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
         """
         # Execute the insert query with transaction management
         record = (
@@ -97,6 +117,7 @@ class DataRecorder:
             query_runtime,
             start_time,
             end_time,
+            variant,
         )
         with self.conn:
             self.conn.execute(insert_query, record)
@@ -0,0 +1,127 @@
+"""
+Progress reporting. The experiment loop only increments counters, a renderer thread reads them at a
+fixed rate and writes statements per second, ETA for the current cell and rolling p50/p99 latency.
+Optionally serves the same numbers as JSON over HTTP for headless runs.
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Progress:
+    """Progress counters with a rate limited renderer.
+
+    record() and start_cell() are called from the experiment thread only. They do plain attribute
+    and list slot assignments, which the renderer thread can read without locks.
+    """
+
+    def __init__(self, interval: float = 0.5, window: int = 1024, stream=sys.stdout):
+        self.interval = interval
+        self.window = window
+        self.stream = stream
+
+        # Written by the experiment thread
+        self.count = 0
+        self.cell = ""
+        self.cell_total = 0
+        self.cell_start_count = 0
+        self.cell_start_time = time.perf_counter()
+        self._latencies = [0.0] * window  # Ring buffer of the last window query times
+
+        self._stop = threading.Event()
+        self._renderer = None
+        self._server = None
+
+    def start_cell(self, cell: str, total: int):
+        """Start a new cell (e.g. system/granularity) with an expected number of statements"""
+        self.cell_start_count = self.count
+        self.cell_start_time = time.perf_counter()
+        self.cell_total = total
+        self.cell = cell
+
+    def record(self, query_runtime: float):
+        """Count one statement. Called outside the timed region"""
+        self._latencies[self.count % self.window] = query_runtime
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        """Current progress. Safe to call from any thread"""
+        count = self.count
+        cell_done = count - self.cell_start_count
+        elapsed = time.perf_counter() - self.cell_start_time
+        rate = cell_done / elapsed if elapsed > 0 else 0.0
+        remaining = max(self.cell_total - cell_done, 0)
+
+        latencies = sorted(self._latencies[: min(count, self.window)])
+        p50 = latencies[int(0.50 * (len(latencies) - 1))] if latencies else None
+        p99 = latencies[int(0.99 * (len(latencies) - 1))] if latencies else None
+        return {
+            "cell": self.cell,
+            "statements": count,
+            "cell_done": cell_done,
+            "cell_total": self.cell_total,
+            "statements_per_second": rate,
+            "eta_seconds": remaining / rate if rate > 0 else None,
+            "p50_seconds": p50,
+            "p99_seconds": p99,
+        }
+
+    def _render(self):
+        state = self.snapshot()
+        eta = f"{state['eta_seconds']:.0f}s" if state["eta_seconds"] is not None else "-"
+        latency = (
+            f"p50 {state['p50_seconds'] * 1000:.3f}ms p99 {state['p99_seconds'] * 1000:.3f}ms"
+            if state["p50_seconds"] is not None
+            else "p50 - p99 -"
+        )
+        self.stream.write(
+            f"\r--{state['cell']} | {state['cell_done']}/{state['cell_total']} | "
+            f"{state['statements_per_second']:.0f} stmt/s | ETA {eta} | {latency}\033[K"
+        )
+        self.stream.flush()
+
+    def _run_renderer(self):
+        while not self._stop.wait(self.interval):
+            self._render()
+        self._render()
+        self.stream.write("\n")
+        self.stream.flush()
+
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """Serve snapshot() as JSON on http://host:port/"""
+        progress = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(progress.snapshot()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep the terminal for the renderer
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def start(self):
+        """Start the renderer thread"""
+        self._stop.clear()
+        self._renderer = threading.Thread(target=self._run_renderer, daemon=True)
+        self._renderer.start()
+
+    def stop(self):
+        """Stop the renderer thread and the HTTP endpoint"""
+        self._stop.set()
+        if self._renderer is not None:
+            self._renderer.join()
+            self._renderer = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,442 @@
+"""
+Run experiments from a declarative spec (YAML or TOML) instead of editing main().
+Expands the spec into a work plan, runs one shard of it and merges the per-shard recorder databases.
+
+Usage:
+    python src/experiment_runner.py plan experiments.yaml [--shard i/n]
+    python src/experiment_runner.py run experiments.yaml [--shard i/n] [--recorder path]
+    python src/experiment_runner.py merge experiment_logs.db experiment_logs.shard*.db
+"""
+
+import argparse
+import inspect
+import itertools
+import logging
+import multiprocessing
+import os
+import sqlite3
+import tomllib
+from dataclasses import dataclass, field
+
+import yaml
+
+import main
+from experiment_logger.data_recorder import (
+    CommitPolicy,
+    DatabaseObject,
+    DatabaseSystem,
+    DataRecorder,
+    DDLCommand,
+    Granularity,
+)
+
+EMBEDDED_SYSTEMS = (DatabaseSystem.SQLITE, DatabaseSystem.DUCKDB)
+
+# Experiment name -> (supported systems, supported probes, experiment function)
+EXPERIMENTS = {
+    "experiment_1": (tuple(DatabaseSystem), main.EXPERIMENT_1_PROBES, main.experiment_1),
+    "sqlite_hash": ((DatabaseSystem.SQLITE,), main.SQLITE_HASH_PROBES, main.experiment_sqlite_hash),
+    "cold_open": (EMBEDDED_SYSTEMS, (DDLCommand.CONNECT,), main.experiment_cold_open),
+    "catalog_cache": (
+        tuple(DatabaseSystem),
+        main.CATALOG_CACHE_PROBES,
+        main.experiment_catalog_cache,
+    ),
+}
+
+# Arguments of the experiment functions set by run_item, not by options
+RUN_ITEM_ARGUMENTS = {
+    "conn",
+    "database_system",
+    "granularities",
+    "repetitions",
+    "probes",
+    "commit_policy",
+    "batch_size",
+}
+
+CONNECTORS = {
+    DatabaseSystem.SQLITE: main.connect_sqlite,
+    DatabaseSystem.DUCKDB: main.connect_duckdb,
+    DatabaseSystem.POSTGRES: main.connect_postgres,
+    DatabaseSystem.SNOWFLAKE: main.connect_snowflake,
+}
+
+
+@dataclass(frozen=True)
+class WorkItem:
+    """One cell of the work plan: an experiment on one system, object kind and granularity"""
+
+    index: int  # Position in the full plan
+    experiment_nr: int  # Position of the experiment in the spec
+    experiment: str
+    system: DatabaseSystem
+    database_object: DatabaseObject
+    granularity: Granularity
+    repetitions: int
+    concurrency: int
+    probes: tuple[DDLCommand, ...]
+    commit_policy: CommitPolicy = CommitPolicy.AUTOCOMMIT
+    batch_size: int = 100
+    options: dict = field(default_factory=dict, hash=False)
+
+    def __str__(self):
+        probes = ",".join(probe.value for probe in self.probes)
+        commit = self.commit_policy.value
+        if self.commit_policy == CommitPolicy.BATCHED:
+            commit = f"{commit}_{self.batch_size}"
+        return f"{self.index:>4} | {self.experiment} | {self.system.value} | {self.database_object.value} | {self.granularity.value} | x{self.repetitions} | {commit} | {probes}"
+
+
+def _parse_enum(enum_cls, value):
+    """Match enum by value, case insensitive. e.g. "duckdb" -> DatabaseSystem.DUCKDB"""
+    for member in enum_cls:
+        if str(member.value).lower() == str(value).lower():
+            return member
+    raise ValueError(f"Unknown {enum_cls.__name__}: {value}")
+
+
+def load_spec(path: str) -> dict:
+    """Load an experiment spec. TOML if the file ends with .toml, YAML otherwise"""
+    if path.endswith(".toml"):
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def expand_plan(spec: dict) -> list[WorkItem]:
+    """Expand a spec into a work plan. Keys of "defaults" apply to every entry of "experiments"."""
+    defaults = spec.get("defaults", {})
+    plan = []
+    for experiment_nr, entry in enumerate(spec["experiments"]):
+        entry = {**defaults, **entry}
+        name = entry["experiment"]
+        if name not in EXPERIMENTS:
+            raise ValueError(f"Unknown experiment: {name}")
+        supported_systems, supported_probes, function = EXPERIMENTS[name]
+
+        systems = [_parse_enum(DatabaseSystem, system) for system in entry["systems"]]
+        objects = [_parse_enum(DatabaseObject, obj) for obj in entry.get("objects", ["table"])]
+        granularities = [
+            _parse_enum(Granularity, gran)
+            for gran in entry.get("granularities", [gran.value for gran in Granularity])
+        ]
+        probes = tuple(
+            _parse_enum(DDLCommand, probe)
+            for probe in entry.get("probes", [probe.value for probe in supported_probes])
+        )
+        commit_policies = [
+            _parse_enum(CommitPolicy, policy)
+            for policy in entry.get("commit_policies", [CommitPolicy.AUTOCOMMIT.value])
+        ]
+        batch_size = int(entry.get("batch_size", 100))
+        repetitions = int(entry.get("repetitions", 3))
+        concurrency = int(entry.get("concurrency", 1))
+        options = entry.get("options", {})
+
+        for system in systems:
+            if system not in supported_systems:
+                raise ValueError(f"{name} does not support {system.value}")
+            if concurrency > 1 and system not in EMBEDDED_SYSTEMS:
+                # Workers would share the same schema on the server
+                raise ValueError(
+                    f"concurrency > 1 is only supported for embedded systems, not {system.value}"
+                )
+        if any(obj != DatabaseObject.TABLE for obj in objects):
+            raise ValueError(f"{name} only supports table objects")
+        if name != "experiment_1" and commit_policies != [CommitPolicy.AUTOCOMMIT]:
+            raise ValueError(f"{name} only supports the autocommit commit policy")
+        if any(probe not in supported_probes for probe in probes):
+            raise ValueError(
+                f"{name} supports the probes {[probe.value for probe in supported_probes]}"
+            )
+        # Checked here so a misspelled option fails the plan and not the run of an item
+        supported_options = set(inspect.signature(function).parameters) - RUN_ITEM_ARGUMENTS
+        unknown_options = set(options) - supported_options
+        if unknown_options:
+            raise ValueError(
+                f"{name} does not support the options {sorted(unknown_options)}. "
+                f"Supported: {sorted(supported_options)}"
+            )
+
+        for system in systems:
+            for obj in objects:
+                for commit_policy in commit_policies:
+                    for gran in granularities:
+                        plan.append(
+                            WorkItem(
+                                index=len(plan),
+                                experiment_nr=experiment_nr,
+                                experiment=name,
+                                system=system,
+                                database_object=obj,
+                                granularity=gran,
+                                repetitions=repetitions,
+                                concurrency=concurrency,
+                                probes=probes,
+                                commit_policy=commit_policy,
+                                batch_size=batch_size,
+                                options=options,
+                            )
+                        )
+    return plan
+
+
+def parse_shard(shard: str) -> tuple[int, int]:
+    """Parse "i/n" with 0 <= i < n"""
+    shard_nr, num_shards = (int(part) for part in shard.split("/"))
+    if not 0 <= shard_nr < num_shards:
+        raise ValueError(f"Invalid shard {shard}. Expected i/n with 0 <= i < n")
+    return shard_nr, num_shards
+
+
+def shard_plan(plan: list[WorkItem], shard_nr: int, num_shards: int) -> list[WorkItem]:
+    """Items of one shard. Largest groups first to the least loaded shard, with cost granularity * repetitions.
+    All items of a server backed system form one group, since every item drops and recreates the same
+    schema on the server. Items of the embedded systems are grouped on their own.
+    Deterministic, so every host computes the same assignment from the same spec."""
+    groups = {}
+    for item in plan:
+        key = item.system.value if item.system not in EMBEDDED_SYSTEMS else item.index
+        groups.setdefault(key, []).append(item)
+
+    def cost(group):
+        return sum(item.granularity.value * item.repetitions for item in group)
+
+    loads = [0] * num_shards
+    assignment = {}
+    for group in sorted(groups.values(), key=lambda group: (-cost(group), group[0].index)):
+        target = loads.index(min(loads))
+        loads[target] += cost(group)
+        for item in group:
+            assignment[item.index] = target
+    return [item for item in plan if assignment[item.index] == shard_nr]
+
+
+def run_item(item: WorkItem):
+    """Run one work item with the experiment functions in main"""
+    logging.info(f"Work item: {item}")
+    if item.experiment == "experiment_1":
+        conn = CONNECTORS[item.system]()
+        main.drop_schema(conn, item.system)
+        main.experiment_1(
+            conn,
+            item.system,
+            granularities=(item.granularity,),
+            repetitions=item.repetitions,
+            probes=item.probes,
+            commit_policy=item.commit_policy,
+            batch_size=item.batch_size,
+            **item.options,
+        )
+        conn.close()
+    elif item.experiment == "sqlite_hash":
+        main.experiment_sqlite_hash(
+            granularities=(item.granularity,),
+            repetitions=item.repetitions,
+            probes=item.probes,
+            **item.options,
+        )
+    elif item.experiment == "catalog_cache":
+        conn = CONNECTORS[item.system]()
+        main.drop_schema(conn, item.system)
+        main.experiment_catalog_cache(
+            conn,
+            item.system,
+            granularities=(item.granularity,),
+            repetitions=item.repetitions,
+            probes=item.probes,
+            **item.options,
+        )
+        conn.close()
+    elif item.experiment == "cold_open":
+        main.experiment_cold_open(
+            item.system,
+            granularities=(item.granularity,),
+            repetitions=item.repetitions,
+            **item.options,
+        )
+
+
+def _use_recorder(path: str):
+    """Record to path. A worker does not close the recorder it inherited from the parent"""
+    main.recorder = DataRecorder(path)
+
+
+def _worker_dbs(worker_nr: int) -> tuple[str, str]:
+    """Sqlite and duckdb database of a worker"""
+    return f"sqlite.w{worker_nr}.db", f"duckdb.w{worker_nr}.db"
+
+
+def _remove_worker_dbs(worker_nr: int):
+    sqlite_db, duckdb_db = _worker_dbs(worker_nr)
+    for path in (
+        sqlite_db,
+        f"{sqlite_db}-journal",
+        f"{sqlite_db}-wal",
+        duckdb_db,
+        f"{duckdb_db}.wal",
+    ):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _run_worker(items: list[WorkItem], recorder_path: str, worker_nr: int):
+    """Worker process. Own database files and recorder so workers do not share state"""
+    main.SQLITE_DB, main.DUCKDB_DB = _worker_dbs(worker_nr)
+    _use_recorder(recorder_path)
+    for item in items:
+        run_item(item)
+    main.recorder.close()
+
+
+def _run_workers(group: list[WorkItem], recorder_path: str, concurrency: int):
+    """Run group round robin over concurrency worker processes and merge their records. The workers
+    contend for CPU and disk, so their records get concurrency=N appended to the variant"""
+    worker_paths = [f"{recorder_path}.w{worker_nr}" for worker_nr in range(concurrency)]
+    workers = [
+        multiprocessing.Process(
+            target=_run_worker,
+            args=(group[worker_nr::concurrency], worker_paths[worker_nr], worker_nr),
+        )
+        for worker_nr in range(concurrency)
+    ]
+    try:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        failed = [nr for nr, worker in enumerate(workers) if worker.exitcode != 0]
+        if failed:
+            raise RuntimeError(
+                f"Workers {failed} exited with codes {[workers[nr].exitcode for nr in failed]}. "
+                f"Nothing was merged, the worker records are kept in {worker_paths}"
+            )
+        _merge_into(main.recorder.conn, worker_paths, variant_suffix=f"concurrency={concurrency}")
+        for path in worker_paths:
+            os.remove(path)
+    finally:
+        for worker_nr in range(concurrency):
+            _remove_worker_dbs(worker_nr)
+
+
+def run_plan(items: list[WorkItem], recorder_path: str, progress_port: int | None = None):
+    """Run the items in plan order. Items of an experiment with concurrency > 1 are split round robin
+    over that many worker processes, whose recorder databases are merged into recorder_path.
+    Progress is rendered for the items run in this process, and served as JSON on progress_port."""
+    _use_recorder(recorder_path)
+    main.progress.start()
+    if progress_port is not None:
+        main.progress.serve(progress_port)
+    try:
+        for _, group in itertools.groupby(items, key=lambda item: item.experiment_nr):
+            group = list(group)
+            concurrency = min(group[0].concurrency, len(group))
+            if concurrency == 1:
+                for item in group:
+                    run_item(item)
+            else:
+                _run_workers(group, recorder_path, concurrency)
+    finally:
+        main.progress.stop()
+        main.recorder.close()
+
+
+def _check_recorders(paths: list[str]):
+    # ATTACH would create a missing file
+    for path in paths:
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Recorder database not found: {path}")
+
+
+def _merge_into(conn: sqlite3.Connection, paths: list[str], variant_suffix: str | None = None):
+    """Append the records of the recorder databases at paths. The inputs are only read.
+    Missing tables are skipped and logs from before the variant column get NULL variants.
+    variant_suffix is appended to the variant of every merged record"""
+    columns = "system_name,ddl_command,query_text,target_object,granularity,repetition_nr,query_runtime,start_time,end_time"
+    _check_recorders(paths)
+    for path in paths:
+        conn.execute("ATTACH DATABASE ? AS shard;", (path,))
+        try:
+            tables = {
+                row[0]
+                for row in conn.execute(
+                    "SELECT name FROM shard.sqlite_master WHERE type = 'table';"
+                )
+            }
+            with conn:
+                for system in DatabaseSystem:
+                    table_name = f"{system.value}db_logs"
+                    if table_name not in tables:
+                        continue
+                    shard_columns = {
+                        row[1] for row in conn.execute(f"PRAGMA shard.table_info({table_name});")
+                    }
+                    variant = "variant" if "variant" in shard_columns else "NULL"
+                    if variant_suffix is not None:
+                        variant = f"CASE WHEN {variant} IS NULL THEN :suffix ELSE {variant} || ',' || :suffix END"
+                    conn.execute(
+                        f"INSERT INTO main.{table_name}({columns},variant) SELECT {columns},{variant} FROM shard.{table_name} ORDER BY id;",
+                        {"suffix": variant_suffix},
+                    )
+        finally:
+            conn.execute("DETACH DATABASE shard;")
+
+
+def merge_recorders(output: str, inputs: list[str]):
+    """Append the records of the input recorder databases to output. Ids are reassigned"""
+    _check_recorders(inputs)
+    recorder = DataRecorder(output)
+    try:
+        _merge_into(recorder.conn, inputs)
+    finally:
+        recorder.close()
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Run experiments from a spec file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for command in ("plan", "run"):
+        sub = subparsers.add_parser(command)
+        sub.add_argument("spec", help="YAML or TOML experiment spec")
+        sub.add_argument("--shard", default="0/1", help="i/n: run shard i of n (0 based)")
+        if command == "run":
+            sub.add_argument(
+                "--recorder", help="Recorder database. Default experiment_logs[.shard_i_of_n].db"
+            )
+            sub.add_argument(
+                "--progress-port", type=int, help="Serve progress as JSON on this port"
+            )
+
+    merge = subparsers.add_parser("merge")
+    merge.add_argument("output")
+    merge.add_argument("inputs", nargs="+")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(format="%(levelname)s%(funcName)20s():%(message)s", level=logging.INFO)
+
+    if args.command == "merge":
+        merge_recorders(args.output, args.inputs)
+        return
+
+    shard_nr, num_shards = parse_shard(args.shard)
+    items = shard_plan(expand_plan(load_spec(args.spec)), shard_nr, num_shards)
+    if args.command == "plan":
+        for item in items:
+            print(item)
+        return
+
+    recorder_path = args.recorder
+    if recorder_path is None:
+        recorder_path = (
+            "experiment_logs.db"
+            if num_shards == 1
+            else f"experiment_logs.shard_{shard_nr}_of_{num_shards}.db"
+        )
+    run_plan(items, recorder_path, args.progress_port)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -7,84 +7,92 @@ import logging
 import os
 import random
 import sqlite3
-import sys
 
 import duckdb
 import psycopg2
 import snowflake.connector
 import yaml
 
+import snowflake_standin
+from catalog_cache import SCHEMA_VERSION_QUERIES, CacheInvalidation, CatalogCache, fetch_rows
 from experiment_logger.data_recorder import (
+    CommitPolicy,
     DatabaseObject,
     DatabaseSystem,
     DataRecorder,
     DDLCommand,
     Granularity,
 )
+from experiment_logger.progress import Progress
+from sqlite_hash import HashDistribution, bucket_count, bucket_histogram, generate_names
 
-recorder = DataRecorder()
+# Created by main() or the experiment runner, so importing main does not create a log database
+recorder: DataRecorder | None = None
+progress = Progress()
 
+SQLITE_DB = "sqlite.db"
+DUCKDB_DB = "duckdb.db"
 
-# Init connections
+
+# Init connections. All connections autocommit, transactions are opened explicitly by Transactions
 def connect_sqlite() -> sqlite3.Connection:
-    return sqlite3.connect("sqlite.db")
+    return sqlite3.connect(SQLITE_DB, isolation_level=None)
 
 
 def connect_duckdb() -> duckdb.DuckDBPyConnection:
-    return duckdb.connect("duckdb.db")
+    return duckdb.connect(DUCKDB_DB)
 
 
 def connect_postgres() -> psycopg2.extensions.connection:
     postgres_conf = yaml.safe_load(open(".config.yaml"))["postgres_conf"]
-    return psycopg2.connect(**postgres_conf)
+    conn = psycopg2.connect(**postgres_conf)
+    conn.autocommit = True
+    return conn
 
 
 def connect_snowflake() -> snowflake.connector.connection.SnowflakeConnection:
-    snowflake_conf = yaml.safe_load(open(".config.yaml"))["snowflake_conf"]
-    return snowflake.connector.connect(**snowflake_conf)
+    """Connect to snowflake, or to the local stand-in if .config.yaml has snowflake_driver: standin"""
+    config = yaml.safe_load(open(".config.yaml"))
+    if config.get("snowflake_driver", "connector") == "standin":
+        return snowflake_standin.connect(**config.get("snowflake_standin_conf", {}))
+    return snowflake.connector.connect(**config["snowflake_conf"])
 
 
-def _get_snowflake_ping():
-    """Ping snowflake connection 10 time for average latency"""
+def _get_snowflake_ping_samples(num_pings: int = 10) -> list[float]:
+    """Ping snowflake connection num_pings times. Round trip times in seconds"""
     with connect_snowflake() as conn:
-        total = 0
-        for i in range(10):
+        samples = []
+        for i in range(num_pings):
             _, _, time = _execute_timed_query(conn, DatabaseSystem.SNOWFLAKE, "SELECT 1;")
-            total += time.total_seconds()
-        return total / 10
+            samples.append(time.total_seconds())
+        return samples
 
 
-def _execute_timed_query(
-    conn, database_system: DatabaseSystem, query: str
-) -> tuple[datetime.datetime, datetime.datetime, datetime.timedelta]:
-    """Execute query and log the query time"""
-    _current_task_loading(query=query)
-    if database_system == DatabaseSystem.SQLITE:
-        with conn:
-            start_time = datetime.datetime.now()
-            conn.execute(query)
-            conn.commit()
-            end_time = datetime.datetime.now()
+def _get_snowflake_ping():
+    """Ping snowflake connection 10 time for average latency"""
+    samples = _get_snowflake_ping_samples(10)
+    return sum(samples) / len(samples)
 
-            query_time = end_time - start_time
 
-    elif database_system == DatabaseSystem.DUCKDB:
+def calibrate_snowflake_standin(num_pings: int = 100) -> snowflake_standin.LatencyModel:
+    """Fit the stand-in latency model to pings of the live service. Copy rtt_median and rtt_sigma
+    to snowflake_standin_conf in .config.yaml"""
+    return snowflake_standin.LatencyModel.from_samples(_get_snowflake_ping_samples(num_pings))
+
+
+def _execute_timed_query(
+    conn, database_system: DatabaseSystem, query: str, count: bool = True
+) -> tuple[datetime.datetime, datetime.datetime, datetime.timedelta]:
+    """Execute query and log the query time. Does not commit, see Transactions.
+    count: include the statement in the progress counters"""
+    if database_system in (DatabaseSystem.SQLITE, DatabaseSystem.DUCKDB):
         start_time = datetime.datetime.now()
         conn.execute(query)
         end_time = datetime.datetime.now()
 
         query_time = end_time - start_time
 
-    elif database_system == DatabaseSystem.POSTGRES:
-        with conn:
-            with conn.cursor() as curs:
-                start_time = datetime.datetime.now()
-                curs.execute(query)
-                end_time = datetime.datetime.now()
-
-                query_time = end_time - start_time
-
-    elif database_system == DatabaseSystem.SNOWFLAKE:
+    elif database_system in (DatabaseSystem.POSTGRES, DatabaseSystem.SNOWFLAKE):
         with conn.cursor() as curs:
             start_time = datetime.datetime.now()
             curs.execute(query)
@@ -92,17 +100,103 @@ def _execute_timed_query(
 
             query_time = end_time - start_time
 
+    if count:
+        progress.record(query_time.total_seconds())
     return start_time, end_time, query_time
 
 
-def _current_task_loading(query: str):
-    """Simulate progress loading in termimal. Writes the following: "--running: {query}..." to terminal. The dots should blink while the query is running.
+class Transactions:
+    """Commit policy of the timed statements. Connections run in driver autocommit mode and
+    transactions are opened with explicit BEGIN/COMMIT statements, which are timed separately
+    from the statements so commit cost is recorded on its own.
 
-    Args:
-        query (str): description to be written to terminal.
+    Snowflake commits DDL implicitly, so BEGIN/COMMIT around DDL measure round trips only.
     """
-    sys.stdout.write(f"\r--running: {query}")
-    sys.stdout.flush()  # Force output to update in terminal
+
+    def __init__(self, policy: CommitPolicy = CommitPolicy.AUTOCOMMIT, batch_size: int = 100):
+        self.set_policy(policy, batch_size)
+
+    def set_policy(self, policy: CommitPolicy, batch_size: int = 100):
+        self.policy = policy
+        self.batch_size = batch_size if policy == CommitPolicy.BATCHED else 1
+        self.open_statements = 0
+        self.in_transaction = False
+
+    @property
+    def label(self) -> str:
+        """Recorded in the variant column"""
+        if self.policy == CommitPolicy.BATCHED:
+            return f"commit={self.policy.value}_{self.batch_size}"
+        return f"commit={self.policy.value}"
+
+    def begin(self, conn, database_system: DatabaseSystem):
+        """BEGIN if the policy uses explicit transactions and none is open. Returns the timing or None"""
+        if self.policy == CommitPolicy.AUTOCOMMIT or self.in_transaction:
+            return None
+        timing = _execute_timed_query(conn, database_system, "BEGIN;", count=False)
+        self.in_transaction = True
+        return timing
+
+    def end(self, conn, database_system: DatabaseSystem, end_of_batch: bool = True):
+        """Count a statement and COMMIT when the batch is full or ends. Returns the timing or None"""
+        if not self.in_transaction:
+            return None
+        self.open_statements += 1
+        if self.open_statements < self.batch_size and not end_of_batch:
+            return None
+        timing = _execute_timed_query(conn, database_system, "COMMIT;", count=False)
+        self.in_transaction = False
+        self.open_statements = 0
+        return timing
+
+    def rollback(self, conn, database_system: DatabaseSystem):
+        """Roll back an open transaction after a failed statement"""
+        if self.in_transaction:
+            self.in_transaction = False
+            self.open_statements = 0
+            try:
+                _execute_timed_query(conn, database_system, "ROLLBACK;", count=False)
+            except Exception as e:
+                logging.error(f"Rollback failed: {e}")
+
+
+transactions = Transactions()
+
+
+def _execute_in_transaction(
+    conn,
+    *,
+    database_system: DatabaseSystem,
+    query: str,
+    database_object: DatabaseObject,
+    granularity: Granularity,
+    num_exp: int,
+    end_of_batch: bool = True,
+    logging: bool = True,
+) -> tuple[datetime.datetime, datetime.datetime, datetime.timedelta]:
+    """Execute query under the commit policy. BEGIN and COMMIT are recorded as their own records.
+    Returns the timing of the statement only"""
+    begin = transactions.begin(conn, database_system)
+    start_time, end_time, query_time = _execute_timed_query(
+        conn=conn, query=query, database_system=database_system
+    )
+    commit = transactions.end(conn, database_system, end_of_batch=end_of_batch)
+    if logging:
+        for ddl_command, timing in ((DDLCommand.BEGIN, begin), (DDLCommand.COMMIT, commit)):
+            if timing is not None:
+                recorder.record(
+                    database_system,
+                    ddl_command,
+                    f"{ddl_command.value};",
+                    database_object,
+                    granularity,
+                    num_exp,
+                    timing[2].total_seconds(),
+                    timing[0],
+                    timing[1],
+                    variant=transactions.label,
+                )
+    return start_time, end_time, query_time
 
 
 def create_tables(
@@ -113,7 +207,6 @@ def create_tables(
     logging=True,
 ):
     """Example: Create 1000 tables"""
-    print()
 
     if database_system == DatabaseSystem.DUCKDB:
         init_query = """CREATE SCHEMA experiment;
@@ -127,8 +220,15 @@ def create_tables(
     for i in range(num_objects.value):
         query = f"CREATE TABLE t_{i} (id INTEGER PRIMARY KEY, value TEXT);"
 
-        start_time, end_time, query_time = _execute_timed_query(
-            conn=conn, query=query, database_system=database_system
+        start_time, end_time, query_time = _execute_in_transaction(
+            conn,
+            database_system=database_system,
+            query=query,
+            database_object=DatabaseObject.TABLE,
+            granularity=num_objects,
+            num_exp=0,
+            end_of_batch=i == num_objects.value - 1,
+            logging=logging,
         )
         if logging:
             record = (
@@ -142,17 +242,28 @@ def create_tables(
                 start_time,
                 end_time,
             )
-            recorder.record(*record)
-    print()
+            recorder.record(*record, variant=transactions.label)
 
 
-def alter_tables(conn, *, database_system: DatabaseSystem, granularity: Granularity, num_exp):
+def alter_tables(
+    conn,
+    *,
+    database_system: DatabaseSystem,
+    granularity: Granularity,
+    num_exp,
+    end_of_batch: bool = True,
+):
     """Example: alter table t_0 add column a. Point query"""
-    print()
     table_num = random.randint(0, granularity.value - 1)  # In case of prefetching
     query = f"ALTER TABLE t_{table_num} ADD COLUMN altered_{num_exp} TEXT;"
-    start_time, end_time, query_time = _execute_timed_query(
-        conn=conn, query=query, database_system=database_system
+    start_time, end_time, query_time = _execute_in_transaction(
+        conn,
+        database_system=database_system,
+        query=query,
+        database_object=DatabaseObject.TABLE,
+        granularity=granularity,
+        num_exp=num_exp,
+        end_of_batch=end_of_batch,
     )
     record = (
         database_system,
@@ -165,16 +276,7 @@ def alter_tables(conn, *, database_system: DatabaseSystem, granularity: Granular
         start_time,
         end_time,
     )
-    recorder.record(*record)
-    print()
-    _comment_object(
-        conn,
-        database_system=database_system,
-        database_object=DatabaseObject.TABLE,
-        granularity=granularity,
-        num_exp=num_exp,
-    )
-    print()
+    recorder.record(*record, variant=transactions.label)
 
 
 def _comment_object(
@@ -184,6 +286,7 @@ def _comment_object(
     database_object: DatabaseObject,
     granularity: Granularity,
     num_exp: int,
+    end_of_batch: bool = True,
 ):
     """Example if comment supported: alter table t1 set comment = 'This table has been altered'\n
     Example if comment not supported: alter table t1 rename to t1_altered"""
@@ -197,9 +300,14 @@ def _comment_object(
     else:
         query = f"comment on {database_object.value} t_{object_num} is 'This {database_object.value} has been altered';"
 
-    _current_task_loading(query)
-    start_time, end_time, query_time = _execute_timed_query(
-        conn=conn, query=query, database_system=database_system
+    start_time, end_time, query_time = _execute_in_transaction(
+        conn,
+        database_system=database_system,
+        query=query,
+        database_object=database_object,
+        granularity=granularity,
+        num_exp=num_exp,
+        end_of_batch=end_of_batch,
     )
     record = (
         database_system,
@@ -212,29 +320,19 @@ def _comment_object(
         start_time,
         end_time,
     )
-    recorder.record(*record)
+    recorder.record(*record, variant=transactions.label)
 
-    # Clean up. For sqlite
+    # Clean up. For sqlite. Joins an open BATCHED transaction, autocommits otherwise
     if database_system == DatabaseSystem.SQLITE and database_object.value == "table":
-        with conn:
-            query = f"alter table t_{object_num} RENAME COLUMN value_altered TO value;"
-            conn.execute(query)
-            conn.commit()
+        query = f"alter table t_{object_num} RENAME COLUMN value_altered TO value;"
+        conn.execute(query)
 
 
-def show_objects(
-    conn,
-    *,
-    database_system: DatabaseSystem,
-    database_object: DatabaseObject,
-    granularity: Granularity,
-    num_exp,
-):
-    """Example: show tables"""
+def _show_query(database_system: DatabaseSystem, database_object: DatabaseObject) -> str:
     if database_system == DatabaseSystem.SQLITE:
-        query = f"""SELECT name FROM sqlite_master WHERE type = '{database_object.value}';"""
+        return f"""SELECT name FROM sqlite_master WHERE type = '{database_object.value}';"""
     elif database_system == DatabaseSystem.POSTGRES:
-        query = """
+        return """
         SELECT n.nspname AS schema_name,
        c.relname AS table_name
         FROM pg_catalog.pg_class c
@@ -243,11 +341,30 @@ def show_objects(
         AND n.nspname NOT IN ('pg_catalog', 'information_schema'); -- Exclude system schemas
         """
     elif database_system == DatabaseSystem.SNOWFLAKE:
-        query = "show tables limit 10000"
+        return "show tables limit 10000"
     else:
-        query = "show tables"
-    start_time, end_time, query_time = _execute_timed_query(
-        conn=conn, query=query, database_system=database_system
+        return "show tables"
+
+
+def show_objects(
+    conn,
+    *,
+    database_system: DatabaseSystem,
+    database_object: DatabaseObject,
+    granularity: Granularity,
+    num_exp,
+    end_of_batch: bool = True,
+):
+    """Example: show tables"""
+    query = _show_query(database_system, database_object)
+    start_time, end_time, query_time = _execute_in_transaction(
+        conn,
+        database_system=database_system,
+        query=query,
+        database_object=database_object,
+        granularity=granularity,
+        num_exp=num_exp,
+        end_of_batch=end_of_batch,
     )
     record = (
         database_system,
@@ -260,8 +377,7 @@ def show_objects(
         start_time,
         end_time,
     )
-    recorder.record(*record)
-    print()
+    recorder.record(*record, variant=transactions.label)
 
 
 def select_objects(
@@ -271,6 +387,7 @@ def select_objects(
     database_object: DatabaseObject,
     granularity: Granularity,
     num_exp,
+    end_of_batch: bool = True,
 ):
     """Example: select * from information_schema.tables"""
     if database_system == DatabaseSystem.SQLITE:
@@ -278,8 +395,14 @@ def select_objects(
     else:
         query = f"select * from information_schema.{database_object.value}s"
 
-    start_time, end_time, query_time = _execute_timed_query(
-        conn=conn, query=query, database_system=database_system
+    start_time, end_time, query_time = _execute_in_transaction(
+        conn,
+        database_system=database_system,
+        query=query,
+        database_object=database_object,
+        granularity=granularity,
+        num_exp=num_exp,
+        end_of_batch=end_of_batch,
     )
     record = (
         database_system,
@@ -292,8 +415,7 @@ def select_objects(
         start_time,
         end_time,
     )
-    recorder.record(*record)
-    print()
+    recorder.record(*record, variant=transactions.label)
 
 
 def drop_schema(conn, database_system: DatabaseSystem):
@@ -301,17 +423,17 @@ def drop_schema(conn, database_system: DatabaseSystem):
     # switch case:
     try:
         if database_system == DatabaseSystem.SQLITE:
-            if os.path.exists("sqlite.db"):
-                os.remove("sqlite.db")
+            if os.path.exists(SQLITE_DB):
+                os.remove(SQLITE_DB)
                 logging.info(f"Dropped: {database_system}")
-        if database_system == DatabaseSystem.DUCKDB:
+        elif database_system == DatabaseSystem.DUCKDB:
             drop_query = "DROP SCHEMA experiment CASCADE;"
             _ = _execute_timed_query(conn=conn, query=drop_query, database_system=database_system)
-        if database_system == DatabaseSystem.POSTGRES:
+        elif database_system == DatabaseSystem.POSTGRES:
             drop_query = """DROP SCHEMA public CASCADE;
                             CREATE SCHEMA public;"""
             _ = _execute_timed_query(conn=conn, query=drop_query, database_system=database_system)
-        if database_system == DatabaseSystem.SNOWFLAKE:
+        elif database_system == DatabaseSystem.SNOWFLAKE:
             with conn.cursor() as curs:
                 curs.execute("use schema public")
                 curs.execute("DROP SCHEMA if exists metadata_experiment CASCADE;")
@@ -321,15 +443,36 @@ def drop_schema(conn, database_system: DatabaseSystem):
         logging.error(f"Drop schema failed: {e}")
 
 
-def experiment_1(conn, database_system: DatabaseSystem):
+EXPERIMENT_1_PROBES = (
+    DDLCommand.ALTER,
+    DDLCommand.COMMENT,
+    DDLCommand.SHOW,
+    DDLCommand.INFORMATION_SCHEMA,
+)
+
+
+def experiment_1(
+    conn,
+    database_system: DatabaseSystem,
+    granularities: tuple[Granularity, ...] = tuple(Granularity),
+    repetitions: int = 3,
+    probes: tuple[DDLCommand, ...] = EXPERIMENT_1_PROBES,
+    commit_policy: CommitPolicy = CommitPolicy.AUTOCOMMIT,
+    batch_size: int = 100,
+):
+    """Create tables and run the DDL probes for every granularity. commit_policy decides how the
+    statements are committed. batch_size is the number of statements per transaction for BATCHED.
+    A batch does not span the CREATE TABLEs and the probes, but spans the probes of all repetitions.
+    The policy is reset to AUTOCOMMIT when the experiment ends"""
+    transactions.set_policy(commit_policy, batch_size)
     try:
-        logging.info("Starting experiment 1!")
+        logging.info(f"Starting experiment 1! ({transactions.label})")
 
-        for gran in Granularity:
+        for gran in granularities:
             if database_system == DatabaseSystem.SQLITE:
-                conn = sqlite3.connect("sqlite.db")
+                conn = connect_sqlite()
             # elif database_system == DatabaseSystem.DUCKDB:
-            #     conn = duckdb.connect("duckdb.db")
+            #     conn = duckdb.connect(DUCKDB_DB)
             # elif database_system == DatabaseSystem.POSTGRES:
             #     conn = psycopg2.connect(**configs.postgres_conf)
             # elif database_system == DatabaseSystem.SNOWFLAKE:
@@ -337,55 +480,499 @@ def experiment_1(conn, database_system: DatabaseSystem):
             logging.info(
                 f"Experiment: 1 | Object: {DatabaseObject.TABLE} | Granularity: {gran.value} | Status: started"
             )
+            progress.start_cell(
+                f"experiment_1 {database_system.value} {gran.value}",
+                gran.value + repetitions * len(probes),
+            )
 
             create_tables(conn, database_system=database_system, num_objects=gran)
-            for num_exp in range(3):
-                alter_tables(
-                    conn,
-                    database_system=database_system,
-                    granularity=gran,
-                    num_exp=num_exp,
-                )
-                show_objects(
-                    conn,
-                    database_system=database_system,
-                    database_object=DatabaseObject.TABLE,
-                    granularity=gran,
-                    num_exp=num_exp,
-                )
-                select_objects(
-                    conn,
-                    database_system=database_system,
-                    database_object=DatabaseObject.TABLE,
-                    granularity=gran,
-                    num_exp=num_exp,
-                )
+            # The last probe statement of the cell commits an open batch
+            last_probe = next((p for p in reversed(EXPERIMENT_1_PROBES) if p in probes), None)
+            for num_exp in range(repetitions):
+                last_repetition = num_exp == repetitions - 1
+                if DDLCommand.ALTER in probes:
+                    alter_tables(
+                        conn,
+                        database_system=database_system,
+                        granularity=gran,
+                        num_exp=num_exp,
+                        end_of_batch=last_repetition and last_probe == DDLCommand.ALTER,
+                    )
+                if DDLCommand.COMMENT in probes:
+                    _comment_object(
+                        conn,
+                        database_system=database_system,
+                        database_object=DatabaseObject.TABLE,
+                        granularity=gran,
+                        num_exp=num_exp,
+                        end_of_batch=last_repetition and last_probe == DDLCommand.COMMENT,
+                    )
+                if DDLCommand.SHOW in probes:
+                    show_objects(
+                        conn,
+                        database_system=database_system,
+                        database_object=DatabaseObject.TABLE,
+                        granularity=gran,
+                        num_exp=num_exp,
+                        end_of_batch=last_repetition and last_probe == DDLCommand.SHOW,
+                    )
+                if DDLCommand.INFORMATION_SCHEMA in probes:
+                    select_objects(
+                        conn,
+                        database_system=database_system,
+                        database_object=DatabaseObject.TABLE,
+                        granularity=gran,
+                        num_exp=num_exp,
+                        end_of_batch=last_repetition
+                        and last_probe == DDLCommand.INFORMATION_SCHEMA,
+                    )
             logging.info(
                 f"Experiment: 1 | Object: {DatabaseObject.TABLE} | Granularity: {gran.value} | Status: SUCCESSFUL"
             )
             drop_schema(conn, database_system)
     except Exception as e:
         logging.error(f"Experiment 1 failed: {e}")
+        transactions.rollback(conn, database_system)
         # drop_schema(conn, database_system)
     finally:
+        # Setup of the other experiments runs create_tables under the module policy
+        transactions.set_policy(CommitPolicy.AUTOCOMMIT)
         logging.info("Experiment 1 finished.")
-        recorder.close()
+
+
+def _record_sqlite_lookups(
+    conn,
+    *,
+    names: list[str],
+    ddl_command: DDLCommand,
+    granularity: Granularity,
+    num_exp: int,
+    num_lookups: int,
+    variant: str,
+):
+    """Statements on random names. PRAGMA: table_info point lookup. ALTER: ADD COLUMN, which makes
+    sqlite re-parse the whole schema, so it measures a schema reload and not a point lookup"""
+    for i in range(num_lookups):
+        name = random.choice(names)
+        if ddl_command == DDLCommand.PRAGMA:
+            query = f"PRAGMA table_info({name});"
+        else:
+            query = f"ALTER TABLE {name} ADD COLUMN altered_{num_exp}_{i} TEXT;"
+        start_time, end_time, query_time = _execute_timed_query(
+            conn=conn, query=query, database_system=DatabaseSystem.SQLITE
+        )
+        recorder.record(
+            DatabaseSystem.SQLITE,
+            ddl_command,
+            query,
+            DatabaseObject.TABLE,
+            granularity,
+            num_exp,
+            query_time.total_seconds(),
+            start_time,
+            end_time,
+            variant=variant,
+        )
+
+
+SQLITE_HASH_PROBES = (DDLCommand.CONNECT, DDLCommand.PRAGMA, DDLCommand.ALTER)
+
+
+def experiment_sqlite_hash(
+    granularities: tuple[Granularity, ...] = tuple(Granularity),
+    repetitions: int = 3,
+    probes: tuple[DDLCommand, ...] = SQLITE_HASH_PROBES,
+    num_lookups: int = 100,
+    num_schema_reloads: int = 3,
+):
+    """SQLite schema hash experiment. For every granularity and HashDistribution create tables whose
+    names land in controlled strHash buckets, then measure schema load on connection open
+    (connect + first statement), num_lookups PRAGMA table_info point lookups and num_schema_reloads
+    ALTER TABLE ADD COLUMN. Every ADD COLUMN re-parses the whole schema, so it costs about as much as
+    a schema load and the total grows quadratically with the number of tables. Keep it low."""
+    database_system = DatabaseSystem.SQLITE
+    try:
+        logging.info("Starting sqlite hash experiment!")
+        for gran in granularities:
+            num_buckets = bucket_count(gran.value)
+            for distribution in HashDistribution:
+                if num_buckets == 0 and distribution != HashDistribution.SEQUENTIAL:
+                    # No bucket array below 10 tables, so every distribution is the sequential one
+                    continue
+                names = generate_names(gran.value, distribution, num_buckets=num_buckets)
+                histogram = bucket_histogram(names, num_buckets)
+                variant = distribution.value
+                logging.info(
+                    f"Experiment: sqlite_hash | Distribution: {variant} | Granularity: {gran.value} | Max bucket: {histogram.max()} | Status: started"
+                )
+                probe_counts = {
+                    DDLCommand.PRAGMA: num_lookups,
+                    DDLCommand.ALTER: num_schema_reloads,
+                }
+                progress.start_cell(
+                    f"sqlite_hash {variant} {gran.value}",
+                    repetitions
+                    * (1 + sum(count for p, count in probe_counts.items() if p in probes)),
+                )
+
+                # Setup is not timed. One explicit transaction for all tables, the sqlite3 module
+                # does not open one before DDL
+                drop_schema(None, database_system)
+                conn = connect_sqlite()
+                conn.execute("BEGIN;")
+                for name in names:
+                    conn.execute(f"CREATE TABLE {name} (id INTEGER PRIMARY KEY, value TEXT);")
+                conn.execute("COMMIT;")
+                conn.close()
+
+                for num_exp in range(repetitions):
+                    # Schema is parsed lazily by the first statement that needs it
+                    first_query = f"PRAGMA table_info({random.choice(names)});"
+                    start_time = datetime.datetime.now()
+                    conn = connect_sqlite()
+                    conn.execute(first_query).fetchall()
+                    end_time = datetime.datetime.now()
+                    progress.record((end_time - start_time).total_seconds())
+                    if DDLCommand.CONNECT in probes:
+                        recorder.record(
+                            database_system,
+                            DDLCommand.CONNECT,
+                            first_query,
+                            DatabaseObject.TABLE,
+                            gran,
+                            num_exp,
+                            (end_time - start_time).total_seconds(),
+                            start_time,
+                            end_time,
+                            variant=variant,
+                        )
+
+                    for ddl_command, count in probe_counts.items():
+                        if ddl_command not in probes:
+                            continue
+                        _record_sqlite_lookups(
+                            conn,
+                            names=names,
+                            ddl_command=ddl_command,
+                            granularity=gran,
+                            num_exp=num_exp,
+                            num_lookups=count,
+                            variant=variant,
+                        )
+                    conn.close()
+
+                logging.info(
+                    f"Experiment: sqlite_hash | Distribution: {variant} | Granularity: {gran.value} | Status: SUCCESSFUL"
+                )
+        drop_schema(None, database_system)
+    except Exception as e:
+        logging.error(f"Sqlite hash experiment failed: {e}")
+    finally:
+        logging.info("Sqlite hash experiment finished.")
+
+
+def _drop_page_cache(path: str):
+    """Evict the database files from the OS page cache with posix_fadvise (Linux).
+    Only drops clean pages, so the files are synced first."""
+    for file in (path, f"{path}-wal", f"{path}-journal", f"{path}.wal"):
+        if os.path.exists(file):
+            fd = os.open(file, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+def _open_connection(database_system: DatabaseSystem, settings: list[str], first_query: str):
+    """Open a connection, apply settings and run the first statement. Returns the open connection.
+    Settings must not need the schema, or they load it before the first statement"""
+    if database_system == DatabaseSystem.SQLITE:
+        conn = connect_sqlite()
+    elif database_system == DatabaseSystem.DUCKDB:
+        conn = connect_duckdb()
+    else:
+        raise ValueError(f"Cold open not supported for {database_system}")
+    for setting in settings:
+        conn.execute(setting)
+    conn.execute(first_query).fetchall()
+    return conn
+
+
+def _reset_embedded_schema(database_system: DatabaseSystem):
+    """Drop the experiment schema and return a new connection to the empty database"""
+    if database_system == DatabaseSystem.SQLITE:
+        drop_schema(None, database_system)
+        return connect_sqlite()
+    conn = connect_duckdb()
+    drop_schema(conn, database_system)
+    return conn
+
+
+def experiment_cold_open(
+    database_system: DatabaseSystem,
+    granularities: tuple[Granularity, ...] = tuple(Granularity),
+    repetitions: int = 3,
+    mmap_sizes: tuple[int, ...] = (0, 268_435_456),
+    cache_sizes: tuple[int, ...] = (500, 16384),
+):
+    """Cold vs warm open experiment for the embedded systems (sqlite, duckdb). For every granularity
+    measure connect + settings + first statement with the OS page cache dropped or warm.
+
+    Sqlite additionally varies PRAGMA mmap_size (bytes, set after connect) and the page cache size
+    (pages). PRAGMA cache_size needs the schema, so setting it after connect would load the schema
+    before the new size applies. The cache size is therefore persisted with PRAGMA default_cache_size
+    in an untimed step before the opens, and sqlite applies it before it loads the schema.
+    The configuration is recorded in the variant column."""
+    if database_system == DatabaseSystem.SQLITE:
+        db_path = SQLITE_DB
+        first_query = "SELECT * FROM main.t_0 LIMIT 1;"
+        # (label, untimed setup statements, statements timed with every open)
+        settings_grid = [
+            (
+                f"mmap_size={mmap_size},default_cache_size={cache_size}",
+                [f"PRAGMA default_cache_size = {cache_size};"],
+                [f"PRAGMA mmap_size = {mmap_size};"],
+            )
+            for cache_size in cache_sizes
+            for mmap_size in mmap_sizes
+        ]
+    else:
+        db_path = DUCKDB_DB
+        first_query = "SELECT * FROM experiment.t_0 LIMIT 1;"
+        settings_grid = [("", [], [])]
+
+    page_caches = ["cold", "warm"]
+    if not hasattr(os, "posix_fadvise"):
+        logging.warning("posix_fadvise not available. Only warm opens are measured")
+        page_caches = ["warm"]
+
+    try:
+        logging.info(f"Starting cold open experiment for {database_system.value}!")
+        for gran in granularities:
+            logging.info(
+                f"Experiment: cold_open | Object: {DatabaseObject.TABLE} | Granularity: {gran.value} | Status: started"
+            )
+            progress.start_cell(
+                f"cold_open {database_system.value} {gran.value}",
+                gran.value + len(settings_grid) * len(page_caches) * repetitions,
+            )
+            # Setup is not timed
+            conn = _reset_embedded_schema(database_system)
+            create_tables(conn, database_system=database_system, num_objects=gran, logging=False)
+            conn.close()
+
+            for label, setup, settings in settings_grid:
+                if setup:
+                    conn = _open_connection(database_system, setup, first_query)
+                    conn.close()
+                for page_cache in page_caches:
+                    variant = (
+                        f"page_cache={page_cache},{label}" if label else f"page_cache={page_cache}"
+                    )
+                    query = " ".join(settings + [first_query])
+                    if page_cache == "warm":
+                        # Untimed open to populate the page cache
+                        _open_connection(database_system, settings, first_query).close()
+
+                    for num_exp in range(repetitions):
+                        if page_cache == "cold":
+                            _drop_page_cache(db_path)
+                        start_time = datetime.datetime.now()
+                        conn = _open_connection(database_system, settings, first_query)
+                        end_time = datetime.datetime.now()
+                        progress.record((end_time - start_time).total_seconds())
+                        conn.close()
+                        recorder.record(
+                            database_system,
+                            DDLCommand.CONNECT,
+                            query,
+                            DatabaseObject.TABLE,
+                            gran,
+                            num_exp,
+                            (end_time - start_time).total_seconds(),
+                            start_time,
+                            end_time,
+                            variant=variant,
+                        )
+            logging.info(
+                f"Experiment: cold_open | Object: {DatabaseObject.TABLE} | Granularity: {gran.value} | Status: SUCCESSFUL"
+            )
+        _reset_embedded_schema(database_system).close()
+    except Exception as e:
+        logging.error(f"Cold open experiment failed: {e}")
+    finally:
+        logging.info("Cold open experiment finished.")
+
+
+def _column_lookup_query(database_system: DatabaseSystem, table_name: str) -> str:
+    """Point lookup of the columns of one table"""
+    if database_system == DatabaseSystem.SQLITE:
+        return f"PRAGMA table_info({table_name});"
+    return f"select column_name, data_type from information_schema.columns where lower(table_name) = '{table_name}'"
+
+
+CATALOG_CACHE_PROBES = (DDLCommand.SHOW, DDLCommand.INFORMATION_SCHEMA, DDLCommand.ALTER)
+
+
+def experiment_catalog_cache(
+    conn,
+    database_system: DatabaseSystem,
+    granularities: tuple[Granularity, ...] = tuple(Granularity),
+    repetitions: int = 3,
+    probes: tuple[DDLCommand, ...] = CATALOG_CACHE_PROBES,
+    num_operations: int = 1000,
+    ddl_ratio: float = 0.01,
+    max_rows: int = 100_000,
+    poll_interval: float = 0.0,
+):
+    """Client-side catalog cache experiment. Runs the same mixed workload of metadata reads (SHOW and
+    INFORMATION_SCHEMA column lookups of random tables) and ALTER TABLE ADD COLUMN (ddl_ratio of the
+    operations) without cache and with a CatalogCache per CacheInvalidation strategy. Every strategy
+    runs on a freshly created schema, so all of them start from the same catalog.
+
+    Reads are recorded with variant cache=<strategy>,hit|miss. For the POLL strategy the schema version
+    poll before a read is timed on its own and recorded as SCHEMA_VERSION, so the read records hold the
+    lookup only and poll + read records add up to the cost of a polled read."""
+    reads = [probe for probe in probes if probe in (DDLCommand.SHOW, DDLCommand.INFORMATION_SCHEMA)]
+    strategies = [None] + [
+        invalidation
+        for invalidation in CacheInvalidation
+        if invalidation != CacheInvalidation.POLL or database_system != DatabaseSystem.SNOWFLAKE
+    ]
+    caller_conn = conn
+    try:
+        logging.info(f"Starting catalog cache experiment for {database_system.value}!")
+        for gran in granularities:
+            logging.info(
+                f"Experiment: catalog_cache | Object: {DatabaseObject.TABLE} | Granularity: {gran.value} | Status: started"
+            )
+            for num_exp in range(repetitions):
+                for strategy in strategies:
+                    name = strategy.value if strategy else "none"
+                    # Fresh schema, so the ALTERs of the previous strategy do not grow the catalog
+                    if database_system == DatabaseSystem.SQLITE:
+                        if conn is not caller_conn:
+                            conn.close()
+                        conn = _reset_embedded_schema(database_system)
+                    else:
+                        drop_schema(conn, database_system)
+                    create_tables(
+                        conn, database_system=database_system, num_objects=gran, logging=False
+                    )
+                    progress.start_cell(f"catalog_cache {name} {gran.value}", num_operations)
+                    cache = None
+                    if strategy is not None:
+                        cache = CatalogCache(
+                            conn,
+                            database_system,
+                            invalidation=strategy,
+                            max_rows=max_rows,
+                            poll_interval=poll_interval,
+                        )
+                    # Same workload for every strategy
+                    rng = random.Random(f"{gran.value}-{num_exp}")
+
+                    for i in range(num_operations):
+                        table_name = f"t_{rng.randint(0, gran.value - 1)}"
+                        if DDLCommand.ALTER in probes and (not reads or rng.random() < ddl_ratio):
+                            ddl_command = DDLCommand.ALTER
+                            query = f"ALTER TABLE {table_name} ADD COLUMN cache_{name}_{num_exp}_{i} TEXT;"
+                        elif reads:
+                            ddl_command = rng.choice(reads)
+                            if ddl_command == DDLCommand.SHOW:
+                                query = _show_query(database_system, DatabaseObject.TABLE)
+                            else:
+                                query = _column_lookup_query(database_system, table_name)
+                        else:
+                            break
+
+                        variant = f"cache={name}"
+                        if (
+                            cache is not None
+                            and cache.invalidation == CacheInvalidation.POLL
+                            and ddl_command != DDLCommand.ALTER
+                        ):
+                            # Timed on its own, the lookup below does not poll again
+                            poll_start = datetime.datetime.now()
+                            polled = cache.poll()
+                            poll_end = datetime.datetime.now()
+                            if polled:
+                                recorder.record(
+                                    database_system,
+                                    DDLCommand.SCHEMA_VERSION,
+                                    SCHEMA_VERSION_QUERIES[database_system],
+                                    DatabaseObject.TABLE,
+                                    gran,
+                                    num_exp,
+                                    (poll_end - poll_start).total_seconds(),
+                                    poll_start,
+                                    poll_end,
+                                    variant=variant,
+                                )
+
+                        start_time = datetime.datetime.now()
+                        if cache is None:
+                            fetch_rows(conn, database_system, query)
+                        elif ddl_command == DDLCommand.ALTER:
+                            cache.execute_ddl(query)
+                        else:
+                            cache.query(query, poll=False)
+                        end_time = datetime.datetime.now()
+                        progress.record((end_time - start_time).total_seconds())
+
+                        if cache is not None and ddl_command != DDLCommand.ALTER:
+                            variant += ",hit" if cache.last_hit else ",miss"
+                        recorder.record(
+                            database_system,
+                            ddl_command,
+                            query,
+                            DatabaseObject.TABLE,
+                            gran,
+                            num_exp,
+                            (end_time - start_time).total_seconds(),
+                            start_time,
+                            end_time,
+                            variant=variant,
+                        )
+                    if cache is not None:
+                        logging.info(
+                            f"Experiment: catalog_cache | Cache: {name} | Hits: {cache.hits} | Misses: {cache.misses} | Invalidations: {cache.invalidations} | Evictions: {cache.evictions}"
+                        )
+
+            logging.info(
+                f"Experiment: catalog_cache | Object: {DatabaseObject.TABLE} | Granularity: {gran.value} | Status: SUCCESSFUL"
+            )
+            drop_schema(conn, database_system)
+    except Exception as e:
+        logging.error(f"Catalog cache experiment failed: {e}")
+    finally:
+        if conn is not caller_conn:
+            conn.close()
+        logging.info("Catalog cache experiment finished.")
 
 
 def main():
+    global recorder
     # logging.basicConfig(
     #     format="%(levelname)s%(funcName)20s():%(message)s", level=logging.INFO
     # )
+    recorder = DataRecorder()
+    progress.start()
+    # progress.serve(8765)  # JSON progress on http://127.0.0.1:8765/
     try:
         # sqlit_conn = connect_sqlite()
         # drop_schema(connect_sqlite(), DatabaseSystem.SQLITE)
         # experiment_1(sqlit_conn, DatabaseSystem.SQLITE)
         # create_tables(sqlit_conn, database_system=DatabaseSystem.SQLITE, num_objects=Granularity.s_100000, logging=False)
+        # experiment_sqlite_hash()
+        # experiment_cold_open(DatabaseSystem.SQLITE)
 
         # duckdb_conn = connect_duckdb()
         # drop_schema(duckdb_conn, DatabaseSystem.DUCKDB)
         # experiment_1(duckdb_conn, DatabaseSystem.DUCKDB)
         # create_tables(duckdb_conn, database_system=DatabaseSystem.DUCKDB, num_objects=Granularity.s_100000, logging=False)
+        # experiment_cold_open(DatabaseSystem.DUCKDB)
 
         # psql_conn = connect_postgres()
         # drop_schema(psql_conn, DatabaseSystem.POSTGRES)
@@ -395,12 +982,15 @@ def main():
         drop_schema(snowflake_conn, DatabaseSystem.SNOWFLAKE)
         experiment_1(snowflake_conn, DatabaseSystem.SNOWFLAKE)
         # print(_get_snowflake_ping())
+        # print(calibrate_snowflake_standin())
+        # experiment_catalog_cache(connect_duckdb(), DatabaseSystem.DUCKDB)
         # show_objects(snowflake_conn, database_system=DatabaseSystem.SNOWFLAKE, database_object=DatabaseObject.TABLE, granularity=Granularity.s_100000, num_exp=2)
 
         logging.info("Done!")
     finally:
         logging.info("Closing all connections")
 
+        progress.stop()
         recorder.close()
         # sqlit_conn.close()
         #
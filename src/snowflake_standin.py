@@ -0,0 +1,198 @@
+"""
+Local Snowflake stand-in for offline runs. Backed by duckdb, accepts the Snowflake SQL subset used in
+main.py and sleeps a modelled round trip time per statement, calibrated from _get_snowflake_ping samples.
+
+Select it in .config.yaml:
+    snowflake_driver: standin
+    snowflake_standin_conf:
+      database: snowflake_standin.db
+      rtt_median: 0.12  # seconds
+      rtt_sigma: 0.25  # log-normal shape
+      seed: 42
+"""
+
+import math
+import random
+import re
+import statistics
+import threading
+import time
+
+import duckdb
+from snowflake.connector.errors import ProgrammingError
+
+# SHOW statements fail above this many rows unless they have a LIMIT (error 090153)
+SHOW_MAX_ROWS = 10_000
+
+_CREATE_OR_REPLACE_SCHEMA = re.compile(
+    r"^\s*create\s+or\s+replace\s+schema\s+(\w+)\s*;?\s*$", re.IGNORECASE
+)
+_USE_SCHEMA = re.compile(r"^\s*use\s+schema\s+(\w+)\s*;?\s*$", re.IGNORECASE)
+_SHOW_TABLES = re.compile(r"^\s*show\s+tables(?:\s+limit\s+(\d+))?\s*;?\s*$", re.IGNORECASE)
+_BEGIN = re.compile(r"^\s*begin(\s+transaction)?\s*;?\s*$", re.IGNORECASE)
+_END = re.compile(r"^\s*(commit|rollback)\s*;?\s*$", re.IGNORECASE)
+_DDL = re.compile(r"^\s*(create|alter|drop|comment)\b", re.IGNORECASE)
+
+
+class LatencyModel:
+    """Log-normal round trip time: rtt_median * exp(rtt_sigma * N(0, 1)).
+    rtt_sigma = 0 gives a constant round trip time."""
+
+    def __init__(self, rtt_median: float = 0.0, rtt_sigma: float = 0.0, seed: int | None = None):
+        self.rtt_median = rtt_median
+        self.rtt_sigma = rtt_sigma
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_samples(cls, samples: list[float], seed: int | None = None) -> "LatencyModel":
+        """Fit to ping round trip times in seconds, e.g. from _get_snowflake_ping_samples()"""
+        logs = [math.log(sample) for sample in samples]
+        sigma = statistics.stdev(logs) if len(logs) > 1 else 0.0
+        return cls(rtt_median=math.exp(statistics.median(logs)), rtt_sigma=sigma, seed=seed)
+
+    def sample(self) -> float:
+        if self.rtt_median <= 0:
+            return 0.0
+        with self._lock:
+            noise = self._random.gauss(0.0, 1.0)
+        return self.rtt_median * math.exp(self.rtt_sigma * noise)
+
+    def wait(self):
+        """Sleep one round trip"""
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+
+    def __repr__(self):
+        return f"LatencyModel(rtt_median={self.rtt_median:.6f}, rtt_sigma={self.rtt_sigma:.4f})"
+
+
+def translate(query: str) -> str:
+    """Rewrite the Snowflake statements duckdb does not accept or runs differently"""
+    replace_schema = _CREATE_OR_REPLACE_SCHEMA.match(query)
+    if replace_schema:
+        # duckdb keeps the existing schema and its tables
+        schema = replace_schema.group(1)
+        return f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema};"
+
+    use_schema = _USE_SCHEMA.match(query)
+    if use_schema:
+        schema = use_schema.group(1)
+        return f"USE {'main' if schema.lower() == 'public' else schema};"
+
+    show_tables = _SHOW_TABLES.match(query)
+    if show_tables:
+        # Columns named like the Snowflake SHOW TABLES result. One row past the limit to detect overflow
+        limit = int(show_tables.group(1)) if show_tables.group(1) else SHOW_MAX_ROWS + 1
+        return f"""SELECT NULL AS created_on, table_name AS name, database_name, schema_name,
+                'TABLE' AS kind, comment, estimated_size AS rows
+                FROM duckdb_tables() WHERE schema_name = current_schema()
+                ORDER BY table_name LIMIT {limit};"""
+    return query
+
+
+class StandinCursor:
+    """Subset of snowflake.connector.cursor.SnowflakeCursor"""
+
+    def __init__(self, connection: "StandinConnection"):
+        self.connection = connection
+        self.description = None
+        self._rows = None
+
+    def execute(self, query: str):
+        self.connection._latency.wait()
+        self._rows, self.description = self.connection._execute(query)
+
+        show_tables = _SHOW_TABLES.match(query)
+        if show_tables and show_tables.group(1) is None and len(self._rows) > SHOW_MAX_ROWS:
+            raise ProgrammingError(
+                msg=f"The result set size exceeded the max number of rows({SHOW_MAX_ROWS}) supported for SHOW statements. Use LIMIT option to limit result set to a smaller number.",
+                errno=90153,
+                sqlstate="22000",
+            )
+        return self
+
+    def fetchall(self):
+        rows, self._rows = self._rows or [], []
+        return rows
+
+    def fetchone(self):
+        if not self._rows:
+            return None
+        return self._rows.pop(0)
+
+    @property
+    def rowcount(self):
+        return len(self._rows) if self._rows is not None else None
+
+    def close(self):
+        self._rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class StandinConnection:
+    """Subset of snowflake.connector.connection.SnowflakeConnection backed by a duckdb database.
+
+    Autocommit like Snowflake. DDL inside an explicit transaction commits the open transaction first
+    and runs on its own, as Snowflake does. All cursors share one duckdb connection, since the current
+    schema and transaction are session state in Snowflake (duckdb cursors are separate connections).
+    """
+
+    def __init__(self, database: str, latency: LatencyModel):
+        self._latency = latency
+        self._latency.wait()  # Login round trip
+        self._conn = duckdb.connect(database)
+        self._lock = threading.Lock()
+        self._in_transaction = False
+
+    def _execute(self, query: str) -> tuple[list[tuple], list | None]:
+        """Rows and description of query"""
+        with self._lock:
+            if _BEGIN.match(query):
+                self._in_transaction = True
+            elif _END.match(query):
+                if not self._in_transaction:
+                    return [], None  # Snowflake accepts COMMIT/ROLLBACK without an open transaction
+                self._in_transaction = False
+            elif _DDL.match(query) and self._in_transaction:
+                self._conn.execute("COMMIT;")
+                self._in_transaction = False
+            self._conn.execute(translate(query))
+            description = self._conn.description
+            return (self._conn.fetchall() if description else []), description
+
+    def cursor(self) -> StandinCursor:
+        return StandinCursor(self)
+
+    def commit(self):
+        with self.cursor() as curs:
+            curs.execute("COMMIT;")
+
+    def rollback(self):
+        with self.cursor() as curs:
+            curs.execute("ROLLBACK;")
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def connect(
+    database: str = "snowflake_standin.db",
+    rtt_median: float = 0.0,
+    rtt_sigma: float = 0.0,
+    seed: int | None = None,
+) -> StandinConnection:
+    """Like snowflake.connector.connect. Arguments as in snowflake_standin_conf"""
+    return StandinConnection(database, LatencyModel(rtt_median, rtt_sigma, seed))
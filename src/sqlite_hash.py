@@ -0,0 +1,127 @@
+"""
+Model of the SQLite identifier hash (hash.c strHash) used by the schema hash tables.
+Used to generate table name sets with a controlled hash-bucket distribution.
+"""
+
+from enum import Enum
+
+import numpy as np
+
+# Knuth multiplicative hashing constant used by strHash()
+KNUTH_CONSTANT = 0x9E3779B1
+
+# rehash() caps the bucket array at SQLITE_MALLOC_SOFT_LIMIT bytes (default 1024)
+# with 16 byte struct _ht entries on 64-bit builds, so large schemas end up with 64 buckets.
+SQLITE_MALLOC_SOFT_LIMIT = 1024
+HT_ENTRY_SIZE = 16
+
+# sqlite3UpperToLower: identity except A-Z
+_UPPER_TO_LOWER = np.arange(256, dtype=np.uint32)
+_UPPER_TO_LOWER[ord("A") : ord("Z") + 1] += ord("a") - ord("A")
+
+
+class HashDistribution(Enum):
+    """Enum for predefined bucket distributions of generated table names"""
+
+    SEQUENTIAL = "sequential"  # t_0, t_1, ... as in experiment_1
+    UNIFORM = "uniform"  # Equal number of names in every bucket
+    ADVERSARIAL = "adversarial"  # Every name in the same bucket
+
+
+def str_hash(names: list[str]) -> np.ndarray:
+    """Vectorized strHash() for a list of ASCII identifiers. Returns uint32 hashes.
+
+    Names are packed into a zero padded byte matrix and hashed one character column at a time,
+    so the python overhead is per column and not per name.
+    """
+    if not names:
+        return np.zeros(0, dtype=np.uint32)
+    packed = np.array(names, dtype=np.bytes_)
+    width = packed.dtype.itemsize
+    chars = packed.view(np.uint8).reshape(len(names), width)
+
+    h = np.zeros(len(names), dtype=np.uint32)
+    for col in range(width):
+        c = chars[:, col]
+        # Zero padding ends the name. uint32 arithmetic wraps like the C unsigned int
+        h = np.where(c != 0, (h + _UPPER_TO_LOWER[c]) * np.uint32(KNUTH_CONSTANT), h)
+    return h
+
+
+def bucket_count(num_entries: int) -> int:
+    """Number of buckets in a sqlite Hash after inserting num_entries elements.
+
+    Follows sqlite3HashInsert(): no bucket array below 10 elements, then rehash to count*2
+    whenever count > 2*htsize, capped by SQLITE_MALLOC_SOFT_LIMIT.
+    """
+    max_size = SQLITE_MALLOC_SOFT_LIMIT // HT_ENTRY_SIZE
+    htsize = 0
+    for count in range(1, num_entries + 1):
+        if count >= 10 and count > 2 * htsize:
+            new_size = min(count * 2, max_size)
+            if new_size == htsize:
+                break
+            htsize = new_size
+    return htsize
+
+
+def bucket_histogram(names: list[str], num_buckets: int) -> np.ndarray:
+    """Number of names per bucket"""
+    if num_buckets == 0:
+        return np.array([len(names)])
+    return np.bincount(str_hash(names) % num_buckets, minlength=num_buckets)
+
+
+def generate_names(
+    num_names: int,
+    distribution: HashDistribution,
+    *,
+    num_buckets: int | None = None,
+    target_bucket: int = 0,
+    chunk_size: int = 1 << 20,
+) -> list[str]:
+    """Generate num_names table names (t_{i}) with the given bucket distribution.
+
+    Candidates are screened in chunks of chunk_size names. The ADVERSARIAL distribution needs
+    roughly num_names * num_buckets candidates, e.g. 6.4M for 100k names in 64 buckets.
+
+    Args:
+        num_names (int): Number of names to generate.
+        distribution (HashDistribution): Bucket distribution of the names.
+        num_buckets (int, optional): Buckets to target. Defaults to the size sqlite reaches for num_names.
+        target_bucket (int): Bucket used for the ADVERSARIAL distribution.
+        chunk_size (int): Number of candidates hashed per batch.
+    """
+    if distribution == HashDistribution.SEQUENTIAL:
+        return [f"t_{i}" for i in range(num_names)]
+
+    if num_buckets is None:
+        num_buckets = bucket_count(num_names)
+    if num_buckets == 0:
+        # No bucket array, every lookup is a linear scan
+        raise ValueError(f"No hash buckets for {num_names} names, use the sequential distribution")
+
+    if distribution == HashDistribution.ADVERSARIAL:
+        quota = np.zeros(num_buckets, dtype=np.int64)
+        quota[target_bucket % num_buckets] = num_names
+    else:
+        quota = np.full(num_buckets, num_names // num_buckets, dtype=np.int64)
+        quota[: num_names % num_buckets] += 1
+
+    names = []
+    start = 0
+    while len(names) < num_names:
+        candidates = [f"t_{i}" for i in range(start, start + chunk_size)]
+        buckets = (str_hash(candidates) % num_buckets).astype(np.int64)
+
+        # Keep the first quota[b] candidates of every bucket b, in candidate order
+        order = np.argsort(buckets, kind="stable")
+        sorted_buckets = buckets[order]
+        first = np.searchsorted(sorted_buckets, np.arange(num_buckets))
+        rank = np.arange(len(order)) - first[sorted_buckets]
+        selected = np.sort(order[rank < quota[sorted_buckets]])
+
+        quota -= np.bincount(buckets[selected], minlength=num_buckets)
+        names.extend(candidates[idx] for idx in selected)
+        start += chunk_size
+    return names
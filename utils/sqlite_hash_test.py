@@ -3,7 +3,7 @@ def str_hash(z):
     Compute a hash for the input string using a technique similar to the sqlite implementation.
     """
     # Example sqlite3UpperToLower array: Convert ASCII to lowercase (or identity for non-alphabetic characters).
-    sqlite3UpperToLower = [i if i < 128 else 0 for i in range(256)]
+    sqlite3UpperToLower = list(range(256))
     for i in range(ord("A"), ord("Z") + 1):
         sqlite3UpperToLower[i] = ord(chr(i).lower())
 
@@ -22,12 +22,15 @@ strings = [f"t_{i}" for i in range(100000)]
 # Compute hashes for the strings
 hashes = {s: str_hash(s) for s in strings}
 
-seen = set()
+seen = {}
 collisions = 0
 
-# Display the results
+# Display the results. Compare hashes with hashes, not names with hashes
 for s, h in hashes.items():
-    if s in seen:
+    if h in seen:
         collisions += 1
-        print(f"Hash for '{s}': {h}")
-    seen.add(h)
+        print(f"Hash for '{s}' collides with '{seen[h]}': {h}")
+    seen[h] = s
+
+print(f"Full 32-bit hash collisions: {collisions}")
+# Vectorized version and bucket distributions used by the experiment: src/sqlite_hash.py